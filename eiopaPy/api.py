@@ -1,22 +1,144 @@
 import const
+from cache import FileCache
 from requests.exceptions import HTTPError
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
+import atexit
+import hashlib
+import time
 import json
 import logging
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# httpx (with h2) multiplexes concurrent requests over one HTTP/2 connection
+try:
+    import httpx
+    import h2
+except ImportError:
+    httpx = None
+
+# orjson decodes large arrays of floats several times faster than json
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Accept-Encoding is left to the clients, they advertise gzip/deflate and br
+# (or zstd) according to the decoders installed, e.g. brotli or brotlicffi
+HEADERS={"Accept":"application/json"}
+
+##session
+RETRIES=3
+RETRY_STATUSES=[502,503,504]
+
+if httpx is not None:
+    class RetryTransport(httpx.HTTPTransport):
+        """httpx only retries failed connections, this also retries the RETRY_STATUSES
+        with the same backoff as the requests adapter"""
+        def handle_request(self, request):
+            for attempt in range(RETRIES):
+                resp=super().handle_request(request)
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp
+                resp.close()
+                time.sleep(0.3*2**attempt)
+            return super().handle_request(request)
+
+    class AsyncRetryTransport(httpx.AsyncHTTPTransport):
+        """async counterpart of RetryTransport"""
+        async def handle_async_request(self, request):
+            for attempt in range(RETRIES):
+                resp=await super().handle_async_request(request)
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp
+                await resp.aclose()
+                await asyncio.sleep(0.3*2**attempt)
+            return await super().handle_async_request(request)
+
+# shared across calls so that TCP/TLS connections are pooled and kept alive
+if httpx is not None:
+    # the transport carries the http2 and pool settings, redirects are followed as with requests
+    SESSION=httpx.Client(transport=RetryTransport(http2=True, limits=httpx.Limits(max_connections=10), retries=RETRIES),
+                         follow_redirects=True, headers=HEADERS)
+    HTTP_ERRORS=(httpx.HTTPStatusError,)
+else:
+    SESSION=requests.Session()
+    SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                                          max_retries=Retry(total=RETRIES, backoff_factor=0.3, status_forcelist=RETRY_STATUSES)))
+    SESSION.headers.update(HEADERS)
+    HTTP_ERRORS=(HTTPError,)
+if aiohttp is not None:
+    HTTP_ERRORS+=(aiohttp.ClientResponseError,)
+atexit.register(SESSION.close)
+
+##cache
+CACHE=FileCache(const.CACHE_DIR(), const.CACHE_TTL())
+
+def cache_key(url):
+    return hashlib.md5(url.encode()).hexdigest()
+
 ##api
-def api_get(path:str):
+def api_get(path:str, cache:bool=False):
+    """cache: read and store the response on disk, only for published (immutable) curves"""
     url=const.API_URL()+"/"+path
+    cached=CACHE.get(cache_key(url)) if cache else None
+    if cached is not None:
+        return {"content":cached,"path":path,"response":None,"ok":True}
+    resp=SESSION.get(url, timeout=30)
+    return finish(resp, resp.content, url, path, cache)
+
+
+async def api_get_async(session, path:str, cache:bool=False):
+    """Coroutine counterpart of api_get, sharing a session opened with async_session()"""
+    url=const.API_URL()+"/"+path
+    cached=CACHE.get(cache_key(url)) if cache else None
+    if cached is not None:
+        return {"content":cached,"path":path,"response":None,"ok":True}
+    if httpx is not None:
+        resp=await session.get(url, timeout=30)
+        return finish(resp, resp.content, url, path, cache)
+
+    # aiohttp has no retry policy, the RETRY_STATUSES are retried here with the same backoff
+    for attempt in range(RETRIES+1):
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            if resp.status not in RETRY_STATUSES or attempt==RETRIES:
+                return finish(resp, await resp.read(), url, path, cache)
+        await asyncio.sleep(0.3*2**attempt)
+
+
+def finish(resp, content, url, path, cache):
+    """Check the status, decode the body and cache it, common to every client.
+    On an error status the body is not decoded: content is empty and ok is False"""
     try:
-        resp=requests.get(url)
         #If the response was successful, no Exception will be raised
         resp.raise_for_status()
-    except HTTPError as http_err:
+    except HTTP_ERRORS as http_err:
         print(f'HTTP error occurred: {http_err}')
+        return {"content":[],"path":path,"response":resp,"ok":False}
     except Exception as err:
         print(f'Other error occurred: {err}')
-        
-    parsed_content = resp.json()[0]
-    
-    return {"content":parsed_content,"path":path,"response":resp}
+        return {"content":[],"path":path,"response":resp,"ok":False}
+
+    parsed_content = json_loads(content)
+    if cache and parsed_content:
+        CACHE.set(cache_key(url), parsed_content)
+
+    return {"content":parsed_content,"path":path,"response":resp,"ok":True}
+
 
+def async_session():
+    """Open an async client capping the number of concurrent sockets,
+    httpx over HTTP/2 when installed, aiohttp otherwise"""
+    if httpx is not None:
+        return httpx.AsyncClient(transport=AsyncRetryTransport(http2=True, limits=httpx.Limits(max_connections=20), retries=RETRIES),
+                                 follow_redirects=True, headers=HEADERS)
+    if aiohttp is None:
+        raise ImportError("aiohttp or httpx is required for the async API: pip install eiopaPy[async] or eiopaPy[http2]")
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=20), headers=HEADERS)
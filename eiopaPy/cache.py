@@ -0,0 +1,56 @@
+import os
+import json
+import time
+import tempfile
+
+
+class FileCache:
+    """JSON file per key, stored as {"ts": timestamp, "value": value}"""
+
+    def __init__(self, directory, ttl):
+        self.directory=directory
+        self.ttl=ttl
+
+    def path(self, key):
+        return os.path.join(self.directory, key+".json")
+
+    def get(self, key):
+        """returns the cached value, or None if missing or older than ttl"""
+        try:
+            with open(self.path(key)) as f:
+                entry=json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or "ts" not in entry or "value" not in entry:
+            return None
+        if time.time()-entry["ts"] >= self.ttl:
+            return None
+        return entry["value"]
+
+    def set(self, key, value):
+        """store value, a failed write (read-only or missing home) only skips the caching"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # unique temp file then rename, so that concurrent writers and readers never see a partial file
+            fd,tmp=tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"ts":time.time(),"value":value}, f)
+                os.replace(tmp, self.path(key))
+            except BaseException:
+                os.remove(tmp)
+                raise
+        except OSError:
+            pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        # also removes the temp files left by interrupted writes
+        for name in os.listdir(self.directory):
+            if name.endswith((".json", ".tmp")):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # removed meanwhile by a concurrent set or clear
+                    pass
@@ -1,6 +1,22 @@
+import os
+import logging
+from urllib.parse import urlencode
+
 def API_URL():
     return "https://mehdiechchelh.com/"
 
+# On-disk cache of the api responses
+def CACHE_DIR():
+    return os.path.join(os.path.expanduser("~"), ".cache", "eiopapy")
+def CACHE_TTL():
+    """seconds, only published curves are cached and they do not change so the default is one year"""
+    default=365*24*3600
+    try:
+        return float(os.environ.get("EIOPAPY_CACHE_TTL", default))
+    except ValueError:
+        logging.warning("Ignoring invalid EIOPAPY_CACHE_TTL=%r, using %s seconds.", os.environ["EIOPAPY_CACHE_TTL"], default)
+        return float(default)
+
 # Type of the risk-free-rate to query
 def WITH_VA():
     return "with_va"
@@ -18,9 +34,10 @@ def VA():
     return "va"
 
 def PATH_GET_RFR(type,region,params):
-    """add description """
-    """params:dict"""
-    return "/api/rfr/%s/%s/?%s" %(type,region,"&".join([elm+"="+params[elm] for elm in params]))
+    """path of the risk-free rates query
+    params:dict of query parameters, empty values are left out"""
+    query=urlencode({key:params[key] for key in params if params[key]}, safe=",")
+    return "/api/rfr/%s/%s/" %(type,region) + ("?"+query if query else "")
 
 def PATH_GET_OPTIONS(field):
     """add description"""
@@ -1,66 +1,167 @@
 from const import *
 import api
 import pandas as pd
+import numpy as np
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numbers
+import datetime
 
-def get_rfr(region,type=option_rfr_types()[0],year=None,month=None,format=["dataframe"]):
-    
+def get_rfr(region,type=option_rfr_types()[0],year=None,month=None,format=["dataframe"],dtype=np.float32):
+    """dtype: float type of the rates, float32 keeps ~7 significant digits,
+    well beyond the decimals published by EIOPA, at half the memory of float64"""
+    format=format[0]
+    path=path_rfr(region,type,year,month)
+    resp=api.api_get(path, cache=is_published(year,month))
+
+    return parse_rfr(resp, format, dtype)
+
+
+async def aget_rfr(region,type=option_rfr_types()[0],year=None,month=None,format=["dataframe"],dtype=np.float32,session=None):
+    """Async version of get_rfr; pass a session from api.async_session() to reuse its connections"""
     format=format[0]
+    path=path_rfr(region,type,year,month)
+    cache=is_published(year,month)
+    if session is None:
+        async with api.async_session() as session:
+            resp=await api.api_get_async(session, path, cache)
+    else:
+        resp=await api.api_get_async(session, path, cache)
+
+    return parse_rfr(resp, format, dtype)
+
+
+async def aget_rfr_batch(specs):
+    """Fetch several curves concurrently over one session.
+    specs: list of dicts of get_rfr keyword arguments, results are returned in the same order"""
+    async with api.async_session() as session:
+        return await asyncio.gather(*[aget_rfr(**spec, session=session) for spec in specs])
+
+
+def get_rfr_concurrent(specs,max_workers=8):
+    """Fetch several curves from a thread pool, for callers that cannot use aget_rfr_batch.
+    specs: list of dicts of get_rfr keyword arguments, results are returned in the same order"""
+    with ThreadPoolExecutor(max_workers) as ex:
+        return list(ex.map(lambda spec: get_rfr(**spec), specs))
+
+
+def get_rfr_multi(regions,type=option_rfr_types()[0],year=None,month=None,format=["dataframe"],dtype=np.float32):
+    """Fetch the curves of several regions with a single request per region.
+    year/month may be lists: they are sent comma-separated and the server answers
+    with one curve per (year, month) combination, all parsed into the same result.
+    returns a dict region -> parsed rfr"""
+    return {region:get_rfr(region,type,year,month,format,dtype) for region in regions}
+
+
+def path_rfr(region,type,year,month):
     if not(isinstance(region,str)):
         raise ValueError("'region' should be of length 1.")
     
-    if isinstance(year,int):
-        year= str(year)
-    else:
-        year= ",".join([str(x) for x in year]) if all([isinstance(x, int) for x in year]) else ""
-    
-    if isinstance(month,int):
-        month=str(month)
-    else:
-        month=",".join([str(x) for x in month]) if all([isinstance(x, int) for x in month]) else ""
-    
-    path=PATH_GET_RFR(type, region,{"year":year, "month":month})
-    resp=api.api_get(path)
+    return PATH_GET_RFR(type, region,{"year":csv_param(year), "month":csv_param(month)})
+
+
+def csv_param(x):
+    """query value of a year/month argument: None, a scalar, or a list joined with commas"""
+    return ",".join(map(str, param_values(x)))
+
+
+def param_values(x):
+    """values of a year/month argument as a list; str and integers are scalars, not sequences"""
+    if x is None:
+        return []
+    if isinstance(x, (str, numbers.Integral)):
+        return [x]
+    return list(x)
+
+
+def is_published(year,month):
+    """True when every requested curve is from a past month, so the response can no longer change.
+    Without year or month the api answers with the latest curve, which is never cached"""
+    years=int_values(year)
+    months=int_values(month)
+    if not years or not months:
+        return False
+    today=datetime.date.today()
+    return (max(years), max(months)) < (today.year, today.month)
+
+
+def int_values(x):
+    """integers of a year/month argument, strings may hold comma-separated values.
+    returns None if any value is not an integer"""
+    try:
+        return [int(v) for v in csv_param(x).split(",") if v.strip()]
+    except ValueError:
+        return None
 
-    parse_rfr(resp, format)
 
+def get_options(field):
+    """Values accepted by the api for a field, e.g. get_options("region")"""
+    return list(get_options_cached(field))
 
-def parse_rfr(resp,format):
+
+@lru_cache(maxsize=16)
+def get_options_cached(field):
+    resp=api.api_get(PATH_GET_OPTIONS(field))
+    # raising keeps a failed request out of the lru_cache, so the next call tries again
+    if not resp["ok"]:
+        raise RuntimeError(f"Could not fetch the options of '{field}'.")
+    # tuple so that the cached value cannot be mutated by callers
+    return tuple(resp["content"])
+
+
+def print_rfr(x):
+    """Print the first three rates of each curve, as print.eiopa_rfr in eiopaR"""
+    previews=x["data"].head(3).to_numpy().T
+    lines=["<eiopa_rfr>"]+[f"{curve_id} > {', '.join(map(str, row))} ..." for curve_id,row in zip(x["data"].columns,previews)]
+    print("\n".join(lines))
+    return x
+
+
+def clear_cache():
+    """Remove the api responses cached on disk"""
+    api.CACHE.clear()
+
+
+def parse_rfr(resp,format,dtype=np.float32):
     if format == "dataframe":
-        return parse_rfr_to_df(resp)
+        return parse_rfr_to_df(resp,dtype)
 
 
-def get_rfr_with_va(region,year=None,month=None,format=["dataframe"]):
+def get_rfr_with_va(region,year=None,month=None,format=["dataframe"],dtype=np.float32):
     type=WITH_VA()
-    get_rfr(region = region,type = type,year = year,month = month)
+    return get_rfr(region = region,type = type,year = year,month = month,format = format,dtype = dtype)
 
 
-def get_rfr_no_va(region,year = None,month = None,format = ["dataframe"]):
+def get_rfr_no_va(region,year = None,month = None,format = ["dataframe"],dtype = np.float32):
     type=NO_VA()
-    get_rfr(region = region,type = type,year = year,month = month)
+    return get_rfr(region = region,type = type,year = year,month = month,format = format,dtype = dtype)
 
 
-def parse_rfr_to_df(resp):
+def parse_rfr_to_df(resp,dtype=np.float32):
     
     # Ensure that the reponse contains data
     content=resp["content"]
     if len(content) == 0:
-        return {"data":pd.DataFrame(),metadata:pd.DataFrame(),format:"df"}
+        return {"data":pd.DataFrame(),"metadata":pd.DataFrame(),"format":"df"}
     
-    # Metadata
-    df_metadata=pd.DataFrame({key:[content[key]] for key in content if key!="data"})
-    # Data
-    df_data=pd.DataFrame({df_metadata["id"][0]:list(content["data"].values())})
-    print("df_data : ",df_data)
+    # Data is one float block filled column by column, shorter curves are padded with NaN.
+    # Metadata keeps every other key: from_records only reads the listed columns,
+    # so the items are passed as is and the response is left untouched.
+    n=max(len(item["data"]) for item in content)
+    # all items share the same schema, so the metadata columns are taken from the first one
+    cols=[key for key in content[0] if key!="data"]
+    arr=np.full((n,len(content)),np.nan,dtype=dtype)
+    ids=[]
+    for j,item in enumerate(content):
+        data_col=item["data"]
+        arr[:len(data_col),j]=list(data_col.values())
+        ids.append(item.get("id","unknown"))
+    df_metadata=pd.DataFrame.from_records(content,columns=cols)
+    df_data=pd.DataFrame(arr,columns=ids,copy=False)
     return {"data":df_data,"metadata":df_metadata,"format":"df"}
 
 
 #resp=get_rfr( "FR","with_va", 2019, 12)
 #resp=get_rfr("no_va", "FR", 2019, 12)
 #print(resp)
-
-# def print.eiopa_rfr(x, *args):
-#     print("<eiopa_rfr>\n")
-#     for i in len(x["metadata"]):
-#         print(sprintf("%s > %s ...\n",x["metadata"]["id"][i],paste(x$data[1:3, i], collapse = ", ")))
-#    }
-#    invisible(x)
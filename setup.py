@@ -21,6 +21,12 @@ setup(
     url="https://github.com/MYACOUBI/eiopaPy",
     license="MIT",
     packages=["eiopaPy"],
-    install_requires=[]
+    install_requires=[],
+    extras_require={
+        "async": ["aiohttp"],
+        "fast": ["orjson"],
+        "http2": ["httpx[http2]"],
+        "brotli": ["brotli"],
+    }
 
 )
\ No newline at end of file